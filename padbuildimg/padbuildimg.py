@@ -1,9 +1,15 @@
+import asyncio
 import math
 import csv
+import json
 import os
 import io
+from itertools import combinations, islice
 from shutil import rmtree
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, OrderedDict
 import re
+import threading
 import urllib
 
 import discord
@@ -22,8 +28,12 @@ from redbot.core.utils.chat_formatting import box, inline
 
 HELP_MSG = """
 ^buildimg <build_shorthand>
+^editbuild <build_shorthand>
+^buildimgguide <build_shorthand or attached text file>
 
 Generates an image representing a team based on a string.
+^editbuild redraws your last build with only the changed slots updated.
+^buildimgguide takes a whole guide and sends it as pages of 3 teams, up to 20 pages.
 
 Format:
     card name(assist)[latent,latent]*repeat|Stats
@@ -125,6 +135,14 @@ TYPE_TO_KILLERS_MAP = {
     'Attacker': [7, 2],  # devil physical
     'Healer': [4, 6],  # dragon attacker
 }
+# bit l is set when killer latent l is allowed
+TYPE_TO_KILLER_MASK = {t: sum(1 << l for l in killers) for t, killers in TYPE_TO_KILLERS_MAP.items()}
+TYPES_TO_KILLER_MASK = {
+    frozenset(types): sum(1 << l for l in {k for t in types for k in TYPE_TO_KILLERS_MAP[t]})
+    for size in range(4)
+    for types in combinations(TYPE_TO_KILLERS_MAP, size)
+}
+TWO_SLOT_LATENTS = frozenset(l for l in LATENTS_MAP if l < 22)
 
 AWK_CIRCLE = 'circle'
 AWK_STAR = 'star'
@@ -133,6 +151,27 @@ REMOTE_ASSET_URL = 'https://github.com/Mushymato/pdchu-cog/raw/master/assets/'
 REMOTE_AWK_URL = 'https://f002.backblazeb2.com/file/dadguide-data/media/awakenings/{0:03d}.png'
 # REMOTE_LAT_URL = 'https://pad.protic.site/wp-content/uploads/pad-latents/'
 
+# sizes the bundled assets and text offsets are drawn for
+NATIVE_PORTRAIT_WIDTH = 100
+NATIVE_LATENTS_WIDTH = 25
+
+SETTINGS_SAVE_DELAY = 5
+USAGE_STATS_SAVE_DELAY = 600
+USAGE_STATS_MAX_ENTRIES = 2000
+PREWARM_COUNT = 50
+PREWARM_DELAY = 0.5
+PORTRAIT_CACHE_SIZE = 300
+TILE_CACHE_SIZE = 300
+LATENTS_CACHE_SIZE = 100
+EDIT_BUILD_CACHE_SIZE = 30
+# guide pages, a row holds card and assist entries so 12 is 6 cards
+PAGE_TEAMS = 3
+PAGE_ROW_SIZE = 12
+MAX_GUIDE_BYTES = 64 * 1024
+MAX_GUIDE_PAGES = 20
+TILE_KEY_FIELDS = ('ID', 'MNO', '+HP', '+ATK', '+RCV', 'LV', 'SLV', 'MAX_SLV', 'AWAKE', 'MAX_AWAKE', 'SUPER')
+
+
 class DictWithAttributeAccess(dict):
     def __getattr__(self, key):
         return self[key]
@@ -141,7 +180,80 @@ class DictWithAttributeAccess(dict):
         self[key] = value
 
 
-class PadBuildImgSettings(CogSettings):
+class FrozenDictWithAttributeAccess(DictWithAttributeAccess):
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('{} is read-only'.format(type(self).__name__))
+
+    __setattr__ = _readonly
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+
+class WriteBehindCogSettings(CogSettings):
+    """CogSettings that batches saves and writes them off the event loop."""
+    save_delay = SETTINGS_SAVE_DELAY
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._save_task = None
+        # snapshots can finish writing out of order, never let an older one replace a newer one
+        self._write_lock = threading.Lock()
+        self._snapshot_generation = 0
+        self._written_generation = 0
+
+    def saveSettingsLater(self):
+        # batch writes: every change made before the pending save fires goes out in one write
+        if self._save_task is not None and not self._save_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save_settings()
+            return
+        self._save_task = loop.create_task(self._saveSettingsAfterDelay())
+
+    def _snapshotSettings(self):
+        self._snapshot_generation += 1
+        return json.dumps(self.bot_settings, indent=4), self._snapshot_generation
+
+    def _writeSettings(self, data, generation):
+        with self._write_lock:
+            if generation < self._written_generation:
+                return
+            self._written_generation = generation
+            tmp_path = self.file_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.file_path)
+
+    async def _saveSettingsAfterDelay(self):
+        await asyncio.sleep(self.save_delay)
+        self._save_task = None
+        # serialize on the loop so the snapshot is consistent, write in the executor
+        data, generation = self._snapshotSettings()
+        await asyncio.get_running_loop().run_in_executor(None, self._writeSettings, data, generation)
+
+    def flushSettings(self):
+        if self._save_task is not None and not self._save_task.done():
+            self._save_task.cancel()
+            self._save_task = None
+            self._writeSettings(*self._snapshotSettings())
+
+
+class PadBuildImgSettings(WriteBehindCogSettings):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # in memory snapshots of bot_settings, rebuilt only when settings change
+        self._build_img_params = None
+        self._dm_only = None
+        # bumped whenever params or assets change so render caches can drop stale entries
+        self.params_version = 0
+
     def make_default_build_img_params(self):
         build_img_params = DictWithAttributeAccess({
             'ASSETS_DIR': './assets/',
@@ -158,18 +270,25 @@ class PadBuildImgSettings(CogSettings):
         #     os.mkdir(build_img_params.OUTPUT_DIR)
         return build_img_params
 
+    def invalidateParams(self):
+        self._build_img_params = None
+        self.params_version += 1
+
     def buildImgParams(self):
-        if 'build_img_params' not in self.bot_settings:
-            self.bot_settings['build_img_params'] = self.make_default_build_img_params()
-            self.save_settings()
-        return DictWithAttributeAccess(self.bot_settings['build_img_params'])
+        if self._build_img_params is None:
+            if 'build_img_params' not in self.bot_settings:
+                self.bot_settings['build_img_params'] = self.make_default_build_img_params()
+                self.saveSettingsLater()
+            self._build_img_params = FrozenDictWithAttributeAccess(self.bot_settings['build_img_params'])
+        return self._build_img_params
 
     def setBuildImgParamsByKey(self, key, value):
         if 'build_img_params' not in self.bot_settings:
             self.bot_settings['build_img_params'] = self.make_default_build_img_params()
         if key in self.bot_settings['build_img_params']:
             self.bot_settings['build_img_params'][key] = value
-        self.save_settings()
+        self.invalidateParams()
+        self.saveSettingsLater()
 
     async def downloadAssets(self, source, target):
         async with aiohttp.ClientSession() as session:
@@ -194,22 +313,66 @@ class PadBuildImgSettings(CogSettings):
         await self.downloadAssets(REMOTE_ASSET_URL + DELAY_BUFFER + '.png', params.ASSETS_DIR + DELAY_BUFFER + '.png')
         font_name = os.path.basename(params.FONT_NAME)
         await self.downloadAssets(REMOTE_ASSET_URL + font_name, params.ASSETS_DIR + font_name)
+        self.invalidateParams()
 
     def dmOnly(self, server_id):
-        if 'dm_only' not in self.bot_settings:
-            self.bot_settings['dm_only'] = []
-            self.save_settings()
-        return server_id in self.bot_settings['dm_only']
+        if self._dm_only is None:
+            self._dm_only = frozenset(self.bot_settings.get('dm_only', []))
+        return server_id in self._dm_only
 
     def toggleDmOnly(self, server_id):
-        if 'dm_only' not in self.bot_settings:
-            self.bot_settings['dm_only'] = []
+        dm_only = self.bot_settings.setdefault('dm_only', [])
+        if server_id in dm_only:
+            dm_only.remove(server_id)
         else:
-            if server_id in self.bot_settings['dm_only']:
-                self.bot_settings['dm_only'].remove(server_id)
-            else:
-                self.bot_settings['dm_only'].append(server_id)
-        self.save_settings()
+            dm_only.append(server_id)
+        self._dm_only = None
+        self.saveSettingsLater()
+
+
+class PadBuildImgUsageStats(WriteBehindCogSettings):
+    """How often monsters, assist pairings, latent loadouts and tiles are used, for cache pre-warming.
+
+    Kept apart from the config and flushed rarely, since every build updates it.
+    """
+    save_delay = USAGE_STATS_SAVE_DELAY
+
+    def recordBuildUsage(self, build, show_supers=None):
+        monsters = Counter()
+        assists = Counter()
+        latents = Counter()
+        tiles = Counter()
+        if show_supers is None:
+            show_supers = len(build['TEAM']) != 2
+        for team in build['TEAM']:
+            for idx in range(0, len(team), 2):
+                card = team[idx]
+                assist = team[idx + 1] if idx + 1 < len(team) else None
+                for c in (card, assist):
+                    if c is not None and c['ID'] != DELAY_BUFFER:
+                        monsters[str(c['ID'])] += 1
+                        tiles[json.dumps(tile_key(c, c['ON_COLOR'], show_supers))] += 1
+                if card is None:
+                    continue
+                if assist is not None:
+                    assists['{}/{}'.format(card['ID'], assist['ID'])] += 1
+                if card['LATENT']:
+                    latents[','.join(str(l) for l in card['LATENT'])] += 1
+        for name, counts in (('monsters', monsters), ('assists', assists), ('latents', latents), ('tiles', tiles)):
+            table = self.bot_settings.setdefault(name, {})
+            for key, count in counts.items():
+                table[key] = table.get(key, 0) + count
+            if len(table) > USAGE_STATS_MAX_ENTRIES:
+                # keep the more popular half so the stats file stays bounded
+                top = Counter(table).most_common(USAGE_STATS_MAX_ENTRIES // 2)
+                table.clear()
+                table.update(top)
+        self.saveSettingsLater()
+
+    def topUsage(self, name, count):
+        table = self.bot_settings.get(name, {})
+        return [key for key, _ in Counter(table).most_common(count)]
+
 
 def lstripalpha(s):
     while s and not s[0].isdigit():
@@ -249,23 +412,7 @@ class PaDTeamLexer(object):
     def t_LATENT(self, t):
         r'\[.+?\]'
         # words in []
-        t.value = [l.strip().lower() for l in t.value.strip('[]').split(',')]
-        for v in t.value.copy():
-            if '*' not in v:
-                continue
-            tmp = [l.strip() for l in v.split('*')]
-            if len(tmp[0]) == 1 and tmp[0].isdigit():
-                count = int(tmp[0])
-                latent = tmp[1]
-            elif len(tmp[1]) == 1 and tmp[1].isdigit():
-                count = int(tmp[1])
-                latent = tmp[0]
-            else:
-                continue
-            idx = t.value.index(v)
-            t.value.remove(v)
-            for i in range(count):
-                t.value.insert(idx, latent)
+        t.value = [latent for l in t.value.strip('[]').split(',') for latent in expand_latent(l.strip().lower())]
         t.value = t.value[0:MAX_LATENTS]
         t.value = [REVERSE_LATENTS_MAP[l] for l in t.value if l in REVERSE_LATENTS_MAP]
         return t
@@ -348,6 +495,28 @@ class PaDTeamLexer(object):
         return self.lexer
 
 
+def expand_latent(v):
+    # sdr*3 or 3*sdr becomes 3 sdr
+    if '*' not in v:
+        return [v]
+    tmp = [l.strip() for l in v.split('*')]
+    if len(tmp[0]) == 1 and tmp[0].isdigit():
+        return [tmp[1]] * int(tmp[0])
+    elif len(tmp[1]) == 1 and tmp[1].isdigit():
+        return [tmp[0]] * int(tmp[1])
+    return [v]
+
+
+def killer_mask(card_types):
+    types = frozenset(t for t in card_types if t is not None)
+    mask = TYPES_TO_KILLER_MASK.get(types)
+    if mask is None:
+        mask = 0
+        for t in types:
+            mask |= TYPE_TO_KILLER_MASK.get(t, 0)
+    return mask
+
+
 def validate_latents(latents, card_types):
     if latents is None:
         return None
@@ -355,14 +524,38 @@ def validate_latents(latents, card_types):
         return None
     if 'Balance' in card_types:
         return latents
-    for idx, l in enumerate(latents):
-        if 0 < l < 9:
-            if not any([l in TYPE_TO_KILLERS_MAP[t] for t in card_types if t is not None]):
-                latents[idx] = None
-    latents = [l for l in latents if l is not None]
+    mask = killer_mask(card_types)
+    latents = [l for l in latents if not 0 < l < 9 or mask >> l & 1]
     return latents if len(latents) > 0 else None
 
 
+def pack_latents(latents, sizes, bar_width, latents_width):
+    """Lay out a latent bar, returns (latent, x, y) for each latent icon that fits."""
+    one_slot = [l for l in latents if l not in TWO_SLOT_LATENTS]
+    two_slot = [l for l in latents if l in TWO_SLOT_LATENTS]
+    if len(one_slot) > len(two_slot):
+        sorted_latents = one_slot + two_slot
+    else:
+        sorted_latents = two_slot + one_slot
+    placements = []
+    x_offset = 0
+    y_offset = 0
+    row_count = 0
+    last_height = 0
+    for l in sorted_latents:
+        width, height = sizes[l]
+        if x_offset + width > bar_width:
+            row_count += 1
+            x_offset = 0
+            y_offset += last_height
+        if row_count >= MAX_LATENTS//4 and x_offset + width >= latents_width * (MAX_LATENTS%4):
+            break
+        placements.append((l, x_offset, y_offset))
+        last_height = height
+        x_offset += width
+    return placements
+
+
 def outline_text(draw, x, y, font, text_color, text, thickness=1):
     shadow_color = 'black'
     draw.text((x - thickness, y - thickness), text, font=font, fill=shadow_color)
@@ -389,31 +582,165 @@ def idx_to_xy(idx):
     return idx // 2, - (idx % 2)
 
 
+def tile_key(card, show_stats, show_supers):
+    return [card.get(f) for f in TILE_KEY_FIELDS] + [show_stats, show_supers]
+
+
+def tile_card(key):
+    card = dict(zip(TILE_KEY_FIELDS, key))
+    return card, key[len(TILE_KEY_FIELDS)], key[len(TILE_KEY_FIELDS) + 1]
+
+
+class LRUCache(object):
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.items = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def get(self, key):
+        if key not in self.items:
+            return None
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def clear(self):
+        self.items.clear()
+
+
+class PadBuildImageCache(object):
+    """Rendered pieces shared across builds, dropped when the settings version changes."""
+
+    def __init__(self):
+        self.version = None
+        self.portraits = LRUCache(PORTRAIT_CACHE_SIZE)
+        self.tiles = LRUCache(TILE_CACHE_SIZE)
+        self.latents = LRUCache(LATENTS_CACHE_SIZE)
+        # assets and fonts scaled for the current params, bounded by the asset folder
+        self.assets = {}
+        self.fonts = {}
+        self.latent_sizes = None
+
+    def sync(self, version):
+        if self.version != version:
+            self.portraits.clear()
+            self.tiles.clear()
+            self.latents.clear()
+            self.assets.clear()
+            self.fonts.clear()
+            self.latent_sizes = None
+            self.version = version
+
+
 class PadBuildImageGenerator(object):
-    def __init__(self, params, padinfo_cog, build_name='pad_build'):
+    def __init__(self, params, padinfo_cog, build_name='pad_build', cache=None):
         self.params = params
         self.padinfo_cog = padinfo_cog
+        self.cache = cache
+        self.portrait_scale = params.PORTRAIT_WIDTH / NATIVE_PORTRAIT_WIDTH
+        self.latents_scale = params.LATENTS_WIDTH / NATIVE_LATENTS_WIDTH
         self.lexer = PaDTeamLexer().build()
         self.build = {
             'NAME': build_name,
             'TEAM': [],
             'INSTRUCTION': None
         }
+        # raw slot strings per team with their parsed cards, used by edit_build
+        self.slots = []
+        self.canvas = None
         self.build_img = None
 
+    @staticmethod
+    def iter_team_strings(input_str):
+        # lazy so long guides are only split as far as they are read
+        pieces = (m.group(0) for m in re.finditer('[^;\n]+', input_str))
+        return (row for row in csv.reader(pieces, delimiter='/') if len(row) > 0)
+
+    def split_build(self, input_str):
+        return list(islice(self.iter_team_strings(input_str), 3))
+
+    def process_pages(self, input_str):
+        """Yield pages of at most PAGE_TEAMS rows, parsing each team only when its page is needed.
+
+        Teams longer than PAGE_ROW_SIZE wrap onto the next row instead of being cut off.
+        """
+        page = []
+        for team in self.iter_team_strings(input_str):
+            cards = [card for slot in team for card in self.process_card(slot)]
+            for i in range(0, len(cards), PAGE_ROW_SIZE):
+                page.append(cards[i:i + PAGE_ROW_SIZE])
+                if len(page) == PAGE_TEAMS:
+                    yield page
+                    page = []
+        if len(page) == 2 and max(len(row) for row in page) > PAGE_ROW_SIZE - 2:
+            # 2 team layouts only fit 5 cards per row
+            yield page[:1]
+            yield page[1:]
+        elif page:
+            yield page
+
     def process_build(self, input_str):
-        team_strings = [row for row in csv.reader(re.split('[;\n]', input_str), delimiter='/') if len(row) > 0]
-        if len(team_strings) > 3:
-            team_strings = team_strings[0:3]
-        for team in team_strings:
-            team_sublist = []
+        for team in self.split_build(input_str):
+            team_slots = []
             for slot in team:
                 try:
-                    team_sublist.extend(self.process_card(slot))
+                    team_slots.append((slot, self.process_card(slot)))
                 except Exception as ex:
                     self.build['TEAM'] = []
+                    self.slots = []
                     raise ex
-            self.build['TEAM'].append(team_sublist)
+            self.slots.append(team_slots)
+            self.build['TEAM'].append([card for _, cards in team_slots for card in cards])
+
+    def edit_build(self, input_str):
+        """Apply a new build string on top of the last one.
+
+        Only slots whose text changed are looked up again, and only cards that differ are redrawn
+        on the existing canvas. Falls back to a full render when the layout changes.
+        Returns the cards of the slots that were looked up again, per team.
+        """
+        prev_slots = [dict(team) for team in self.slots]
+        slots = []
+        changed = []
+        for t_idx, team in enumerate(self.split_build(input_str)):
+            prev = prev_slots[t_idx] if t_idx < len(prev_slots) else {}
+            team_slots = []
+            team_changed = []
+            for slot in team:
+                if slot in prev:
+                    team_slots.append((slot, prev[slot]))
+                else:
+                    cards = self.process_card(slot)
+                    team_slots.append((slot, cards))
+                    team_changed.extend(cards)
+            slots.append(team_slots)
+            changed.append(team_changed)
+        prev_team = self.build['TEAM']
+        prev_layout = self.layout_signature()
+        self.slots = slots
+        self.build['TEAM'] = [[card for _, cards in team_slots for card in cards] for team_slots in slots]
+        if self.canvas is None or self.layout_signature() != prev_layout:
+            self.generate_build_image()
+            return changed
+        for t_idx, (y_offset, has_latents) in enumerate(self.team_offsets()[0]):
+            team = self.build['TEAM'][t_idx]
+            for idx in range(max(len(team), len(prev_team[t_idx]))):
+                if self.skip_idx(idx):
+                    break
+                card = team[idx] if idx < len(team) else None
+                prev_card = prev_team[t_idx][idx] if idx < len(prev_team[t_idx]) else None
+                if card != prev_card:
+                    self.clear_card(idx, y_offset, has_latents)
+                    self.paste_card(idx, card, y_offset, has_latents)
+        self.build_img = trim(self.canvas)
+        return changed
 
     def process_card(self, card_str, is_assist=False):
         if not is_assist:
@@ -536,96 +863,208 @@ class PadBuildImageGenerator(object):
             return False
         if len(latents) > MAX_LATENTS:
             latents = latents[0:MAX_LATENTS]
+        if self.cache is not None:
+            key = tuple(latents)
+            latents_bar = self.cache.latents.get(key)
+            if latents_bar is None:
+                latents_bar = self.draw_latents(latents)
+                self.cache.latents.put(key, latents_bar)
+            return latents_bar
+        return self.draw_latents(latents)
+
+    def latent_sizes(self, latents):
+        # icon sizes at the configured LATENTS_WIDTH, measured once per settings version
+        if self.cache is None:
+            return {l: self.load_asset('lat/' + LATENTS_MAP[l] + '.png', self.latents_scale).size for l in latents}
+        if self.cache.latent_sizes is None:
+            self.cache.latent_sizes = {l: self.load_asset('lat/' + name + '.png', self.latents_scale).size
+                                       for l, name in LATENTS_MAP.items()}
+        return self.cache.latent_sizes
+
+    def draw_latents(self, latents):
         latents_bar = Image.new('RGBA',
                                 (self.params.PORTRAIT_WIDTH, self.params.LATENTS_WIDTH * 2),
                                 (255, 255, 255, 0))
-        x_offset = 0
-        y_offset = 0
-        row_count = 0
-        one_slot, two_slot = [], []
-        for l in latents:
-            if l < 22:
-                two_slot.append(l)
-            else:
-                one_slot.append(l)
-        sorted_latents = []
-        if len(one_slot) > len(two_slot):
-            sorted_latents.extend(one_slot)
-            sorted_latents.extend(two_slot)
-        else:
-            sorted_latents.extend(two_slot)
-            sorted_latents.extend(one_slot)
-        last_height = 0
-        for l in sorted_latents:
-            latent_icon = Image.open(self.params.ASSETS_DIR + 'lat/' + LATENTS_MAP[l] + '.png')
-            if x_offset + latent_icon.size[0] > self.params.PORTRAIT_WIDTH:
-                row_count += 1
-                x_offset = 0
-                y_offset += last_height
-            if row_count >= MAX_LATENTS//4 and x_offset + latent_icon.size[0] >= self.params.LATENTS_WIDTH * (MAX_LATENTS%4):
-                break
+        placements = pack_latents(latents, self.latent_sizes(latents),
+                                  self.params.PORTRAIT_WIDTH, self.params.LATENTS_WIDTH)
+        for l, x_offset, y_offset in placements:
+            latent_icon = self.load_asset('lat/' + LATENTS_MAP[l] + '.png', self.latents_scale)
             latents_bar.paste(latent_icon, (x_offset, y_offset))
-            last_height = latent_icon.size[1]
-            x_offset += latent_icon.size[0]
-
         return latents_bar
 
-    def combine_portrait(self, card, show_stats=True, show_supers=False):
-        if card['ID'] == DELAY_BUFFER:
-            return Image.open(self.params.ASSETS_DIR + DELAY_BUFFER + '.png')
+    def scale(self, value):
+        # scale a pixel offset or font size drawn for NATIVE_PORTRAIT_WIDTH
+        return round(value * self.portrait_scale)
+
+    def font(self, size):
+        size = max(1, self.scale(size))
+        if self.cache is not None and size in self.cache.fonts:
+            return self.cache.fonts[size]
+        font = ImageFont.truetype(self.params.FONT_NAME, size)
+        if self.cache is not None:
+            self.cache.fonts[size] = font
+        return font
+
+    def load_asset(self, name, scale):
+        # returns a shared image when cached, copy it before drawing on it
+        if self.cache is not None and name in self.cache.assets:
+            return self.cache.assets[name]
+        asset = Image.open(self.params.ASSETS_DIR + name)
+        asset.load()
+        if scale != 1:
+            asset = asset.convert('RGBA').resize((max(1, round(asset.size[0] * scale)),
+                                                  max(1, round(asset.size[1] * scale))),
+                                                 Image.LANCZOS)
+        if self.cache is not None:
+            self.cache.assets[name] = asset
+        return asset
+
+    def open_portrait(self, monster_id):
         if 'http' in self.params.PORTRAIT_DIR:
-            portrait = Image.open(urllib.request.urlopen(self.params.PORTRAIT_DIR.format(monster_id=card['ID'])))
+            portrait = Image.open(urllib.request.urlopen(self.params.PORTRAIT_DIR.format(monster_id=monster_id)))
         else:
-            portrait = Image.open(self.params.PORTRAIT_DIR.format(monster_id=card['ID']))
+            portrait = Image.open(self.params.PORTRAIT_DIR.format(monster_id=monster_id))
+        portrait.load()
+        if portrait.size != (self.params.PORTRAIT_WIDTH, self.params.PORTRAIT_WIDTH):
+            portrait = portrait.convert('RGBA').resize((self.params.PORTRAIT_WIDTH, self.params.PORTRAIT_WIDTH),
+                                                       Image.LANCZOS)
+        return portrait
+
+    def load_portrait(self, monster_id):
+        # returns a copy that is safe to draw on
+        if self.cache is None:
+            return self.open_portrait(monster_id)
+        portrait = self.cache.portraits.get(monster_id)
+        if portrait is None:
+            portrait = self.open_portrait(monster_id)
+            self.cache.portraits.put(monster_id, portrait)
+        return portrait.copy()
+
+    def combine_portrait(self, card, show_stats=True, show_supers=False):
+        if card['ID'] == DELAY_BUFFER:
+            return self.load_asset(DELAY_BUFFER + '.png', self.portrait_scale)
+        if self.cache is not None:
+            key = tuple(tile_key(card, show_stats, show_supers))
+            portrait = self.cache.tiles.get(key)
+            if portrait is None:
+                portrait = self.draw_portrait(card, show_stats, show_supers)
+                self.cache.tiles.put(key, portrait)
+            return portrait
+        return self.draw_portrait(card, show_stats, show_supers)
+
+    def draw_portrait(self, card, show_stats=True, show_supers=False):
+        portrait = self.load_portrait(card['ID'])
         draw = ImageDraw.Draw(portrait)
-        slv_offset = 80
+        thickness = max(1, self.scale(1))
+        slv_offset = self.scale(80)
         if show_stats:
             # + eggsinclude_instructions
             sum_plus = card['+HP'] + card['+ATK'] + card['+RCV']
             if 0 < sum_plus:
                 if sum_plus < 297:
-                    font = ImageFont.truetype(self.params.FONT_NAME, 14)
-                    outline_text(draw, 5, 2, font, 'yellow', '+{:d} HP'.format(card['+HP']))
-                    outline_text(draw, 5, 14, font, 'yellow', '+{:d} ATK'.format(card['+ATK']))
-                    outline_text(draw, 5, 26, font, 'yellow', '+{:d} RCV'.format(card['+RCV']))
+                    font = self.font(14)
+                    outline_text(draw, self.scale(5), self.scale(2), font, 'yellow',
+                                 '+{:d} HP'.format(card['+HP']), thickness)
+                    outline_text(draw, self.scale(5), self.scale(14), font, 'yellow',
+                                 '+{:d} ATK'.format(card['+ATK']), thickness)
+                    outline_text(draw, self.scale(5), self.scale(26), font, 'yellow',
+                                 '+{:d} RCV'.format(card['+RCV']), thickness)
                 else:
-                    font = ImageFont.truetype(self.params.FONT_NAME, 18)
-                    outline_text(draw, 5, 0, font, 'yellow', '+297')
+                    outline_text(draw, self.scale(5), 0, self.font(18), 'yellow', '+297', thickness)
             # level
             if card['LV'] > 0:
-                outline_text(draw, 5, 75, ImageFont.truetype(self.params.FONT_NAME, 18),
-                             'white', 'Lv.{:d}'.format(card['LV']))
-                slv_offset = 65
+                outline_text(draw, self.scale(5), self.scale(75), self.font(18),
+                             'white', 'Lv.{:d}'.format(card['LV']), thickness)
+                slv_offset = self.scale(65)
         # skill level
         if card['MAX_SLV'] > 0 and card['SLV'] > 0:
             slv_txt = 'SLv.max' if card['SLV'] >= card['MAX_SLV'] else 'SLv.{:d}'.format(card['SLV'])
-            outline_text(draw, 5, slv_offset,
-                         ImageFont.truetype(self.params.FONT_NAME, 12), 'pink', slv_txt)
+            outline_text(draw, self.scale(5), slv_offset, self.font(12), 'pink', slv_txt, thickness)
         # ID
-        outline_text(draw, 67, 82, ImageFont.truetype(self.params.FONT_NAME, 12), 'lightblue', str(card['MNO']))
+        outline_text(draw, self.scale(67), self.scale(82), self.font(12), 'lightblue', str(card['MNO']), thickness)
         del draw
         if card['MAX_AWAKE'] > 0:
             # awakening
             if card['AWAKE'] >= card['MAX_AWAKE']:
-                awake = Image.open(self.params.ASSETS_DIR + AWK_STAR + '.png')
+                awake = self.load_asset(AWK_STAR + '.png', self.portrait_scale)
             else:
-                awake = Image.open(self.params.ASSETS_DIR + AWK_CIRCLE + '.png')
+                awake = self.load_asset(AWK_CIRCLE + '.png', self.portrait_scale).copy()
                 draw = ImageDraw.Draw(awake)
-                draw.text((8, -2), str(card['AWAKE']),
-                          font=ImageFont.truetype(self.params.FONT_NAME, 18), fill='yellow')
+                draw.text((self.scale(8), self.scale(-2)), str(card['AWAKE']),
+                          font=self.font(18), fill='yellow')
                 del draw
-            portrait.paste(awake, (self.params.PORTRAIT_WIDTH - awake.size[0] - 5, 5), awake)
-            awake.close()
+            portrait.paste(awake, (self.params.PORTRAIT_WIDTH - awake.size[0] - self.scale(5), self.scale(5)), awake)
         if show_supers and card['SUPER'] > 0:
             # SA
-            awake = Image.open(self.params.ASSETS_DIR + 'awk/' + str(card['SUPER']) + '.png')
+            awake = self.load_asset('awk/' + str(card['SUPER']) + '.png', self.portrait_scale)
             portrait.paste(awake,
-                           (self.params.PORTRAIT_WIDTH - awake.size[0] - 5,
+                           (self.params.PORTRAIT_WIDTH - awake.size[0] - self.scale(5),
                             (self.params.PORTRAIT_WIDTH - awake.size[0]) // 2),
                            awake)
-            awake.close()
         return portrait
 
+    @staticmethod
+    def team_layout(team):
+        has_assist = any([card is not None for idx, card in enumerate(team) if idx % 2 == 1])
+        has_latents = any([card['LATENT'] is not None for idx, card in enumerate(team)
+                           if idx % 2 == 0 and card is not None])
+        return has_assist, has_latents
+
+    def layout_signature(self):
+        if not self.build['TEAM']:
+            return None
+        return (len(self.build['TEAM']),
+                max([len(x) for x in self.build['TEAM']]),
+                tuple(self.team_layout(team) for team in self.build['TEAM']))
+
+    def team_offsets(self):
+        offsets = []
+        y_offset = 0
+        for team in self.build['TEAM']:
+            has_assist, has_latents = self.team_layout(team)
+            if has_assist:
+                y_offset += self.params.PORTRAIT_WIDTH
+            offsets.append((y_offset, has_latents))
+            y_offset += self.params.PORTRAIT_WIDTH + self.params.PADDING * 2
+            if has_latents:
+                y_offset += self.params.LATENTS_WIDTH * 2
+        return offsets, y_offset
+
+    def skip_idx(self, idx):
+        return idx > 11 or idx > 9 and len(self.build['TEAM']) % 2 == 0
+
+    def card_xy(self, idx, y_offset):
+        x, y = idx_to_xy(idx)
+        x_offset = self.params.PADDING * math.ceil(x / 4)
+        return x_offset + x * self.params.PORTRAIT_WIDTH, y_offset + y * self.params.PORTRAIT_WIDTH
+
+    def clear_card(self, idx, y_offset, has_latents):
+        x, y = self.card_xy(idx, y_offset)
+        height = self.params.PORTRAIT_WIDTH
+        # the latent row only exists when team_offsets made room for it
+        if has_latents and idx % 2 == 0:
+            height += self.params.LATENTS_WIDTH * 2
+        self.canvas.paste((255, 255, 255, 0), (x, y, x + self.params.PORTRAIT_WIDTH, y + height))
+
+    def paste_card(self, idx, card, y_offset, has_latents):
+        if card is None:
+            return
+        portrait = self.combine_portrait(
+            card,
+            show_stats=card['ON_COLOR'],
+            show_supers=len(self.build['TEAM']) != 2)
+        if portrait is None:
+            return
+        x, y = self.card_xy(idx, y_offset)
+        self.canvas.paste(portrait, (x, y))
+        if has_latents and idx % 2 == 0 and card['LATENT'] is not None:
+            latents = self.combine_latents(card['LATENT'])
+            self.canvas.paste(latents, (x, y + self.params.PORTRAIT_WIDTH))
+            if self.cache is None:
+                latents.close()
+        if self.cache is None:
+            portrait.close()
+
     def generate_build_image(self, include_instructions=False):
         if self.build is None:
             return
@@ -637,49 +1076,21 @@ class PadBuildImageGenerator(object):
         include_instructions &= self.build['INSTRUCTION'] is not None
         if include_instructions:
             p_h += len(self.build['INSTRUCTION']) * (self.params.PORTRAIT_WIDTH // 2 + self.params.PADDING)
-        self.build_img = Image.new('RGBA',
-                                   (p_w, p_h),
-                                   (255, 255, 255, 0))
-        y_offset = 0
-        for team in self.build['TEAM']:
-            has_assist = any([card is not None for idx, card in enumerate(team) if idx % 2 == 1])
-            has_latents = any([card['LATENT'] is not None for idx, card in enumerate(team)
-                               if idx % 2 == 0 and card is not None])
-            if has_assist:
-                y_offset += self.params.PORTRAIT_WIDTH
+        self.canvas = Image.new('RGBA',
+                                (p_w, p_h),
+                                (255, 255, 255, 0))
+        offsets, y_offset = self.team_offsets()
+        for team, (team_y_offset, has_latents) in zip(self.build['TEAM'], offsets):
             for idx, card in enumerate(team):
-                if idx > 11 or idx > 9 and len(self.build['TEAM']) % 2 == 0:
+                if self.skip_idx(idx):
                     break
-                if card is not None:
-                    x, y = idx_to_xy(idx)
-                    portrait = self.combine_portrait(
-                        card,
-                        show_stats=card['ON_COLOR'],
-                        show_supers=len(self.build['TEAM']) != 2)
-                    if portrait is None:
-                        continue
-                    x_offset = self.params.PADDING * math.ceil(x / 4)
-                    self.build_img.paste(
-                        portrait,
-                        (x_offset + x * self.params.PORTRAIT_WIDTH,
-                         y_offset + y * self.params.PORTRAIT_WIDTH))
-                    if has_latents and idx % 2 == 0 and card['LATENT'] is not None:
-                        latents = self.combine_latents(card['LATENT'])
-                        self.build_img.paste(
-                            latents,
-                            (x_offset + x * self.params.PORTRAIT_WIDTH,
-                             y_offset + (y + 1) * self.params.PORTRAIT_WIDTH))
-                        latents.close()
-                    portrait.close()
-            y_offset += self.params.PORTRAIT_WIDTH + self.params.PADDING * 2
-            if has_latents:
-                y_offset += self.params.LATENTS_WIDTH * 2
+                self.paste_card(idx, card, team_y_offset, has_latents)
 
         if include_instructions:
             y_offset -= self.params.PADDING * 2
-            draw = ImageDraw.Draw(self.build_img)
-            font = ImageFont.truetype(self.params.FONT_NAME, 24)
-            text_padding = text_center_pad(25, self.params.PORTRAIT_WIDTH // 2)
+            draw = ImageDraw.Draw(self.canvas)
+            font = self.font(24)
+            text_padding = text_center_pad(self.scale(25), self.params.PORTRAIT_WIDTH // 2)
             for step in self.build['INSTRUCTION']:
                 x_offset = self.params.PADDING
                 outline_text(draw, x_offset, y_offset + text_padding,
@@ -690,18 +1101,27 @@ class PadBuildImageGenerator(object):
                                     for idx, side in enumerate(step['ACTIVE'])
                                     for ids in side]
                     for card in actives_used:
-                        if 'http' in self.params.PORTRAIT_DIR:
-                            p_small = Image.open(urllib.request.urlopen(self.params.PORTRAIT_DIR.format(monster_id=card['ID']))).resize((self.params.PORTRAIT_WIDTH // 2, self.params.PORTRAIT_WIDTH // 2), Image.LINEAR)
-                        else:
-                            p_small = Image.open(self.params.PORTRAIT_DIR.format(monster_id=card['ID'])).resize((self.params.PORTRAIT_WIDTH // 2, self.params.PORTRAIT_WIDTH // 2), Image.LINEAR)
-                        self.build_img.paste(p_small, (x_offset, y_offset))
+                        p_small = self.load_portrait(card['ID']).resize((self.params.PORTRAIT_WIDTH // 2, self.params.PORTRAIT_WIDTH // 2), Image.LINEAR)
+                        self.canvas.paste(p_small, (x_offset, y_offset))
                         x_offset += self.params.PORTRAIT_WIDTH // 2
                     x_offset += self.params.PADDING
                 outline_text(draw, x_offset, y_offset + text_padding, font, 'white', step['ACTION'])
                 y_offset += self.params.PORTRAIT_WIDTH // 2
             del draw
 
-        self.build_img = trim(self.build_img)
+        self.build_img = trim(self.canvas)
+
+
+def render_page(params, teams, cache=None):
+    """Draw one guide page and return it as PNG bytes, safe to run in an executor."""
+    pbg = PadBuildImageGenerator(params, None, cache=cache)
+    pbg.build['TEAM'] = teams
+    pbg.generate_build_image()
+    if pbg.build_img is None:
+        return None
+    with io.BytesIO() as build_io:
+        pbg.build_img.save(build_io, format='PNG')
+        return build_io.getvalue()
 
 
 class PadBuildImage(commands.Cog):
@@ -710,6 +1130,91 @@ class PadBuildImage(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.settings = PadBuildImgSettings("padbuildimg")
+        self.usage = PadBuildImgUsageStats("padbuildimg_usage")
+        self.cache = PadBuildImageCache()
+        # last generator per user, kept for ^editbuild
+        self.last_builds = LRUCache(EDIT_BUILD_CACHE_SIZE)
+        # one worker so a render cache is never used from two threads at once
+        self.render_executor = ThreadPoolExecutor(max_workers=1)
+        self._prewarm_task = None
+        self.startPrewarm()
+
+    def cog_unload(self):
+        if self._prewarm_task is not None:
+            self._prewarm_task.cancel()
+        self.render_executor.shutdown(wait=False)
+        self.settings.flushSettings()
+        self.usage.flushSettings()
+
+    def startPrewarm(self):
+        if self._prewarm_task is not None:
+            self._prewarm_task.cancel()
+        self._prewarm_task = self.bot.loop.create_task(self.prewarmCaches())
+
+    async def prewarmCaches(self):
+        """Fill the portrait, tile and latent caches with the most used entries, slowly, in the background."""
+        version = self.settings.params_version
+        self.cache.sync(version)
+        pbg = PadBuildImageGenerator(self.settings.buildImgParams(), None, cache=self.cache)
+        loop = asyncio.get_running_loop()
+
+        monster_ids = []
+        for key in self.usage.topUsage('monsters', PREWARM_COUNT):
+            monster_ids.append(int(key))
+        for key in self.usage.topUsage('assists', PREWARM_COUNT):
+            monster_ids.extend(int(m) for m in key.split('/') if m.isdigit())
+        for monster_id in OrderedDict.fromkeys(monster_ids):
+            if self.settings.params_version != version:
+                return
+            if monster_id in self.cache.portraits:
+                continue
+            try:
+                # downloads block, so keep them off the event loop
+                portrait = await loop.run_in_executor(None, pbg.open_portrait, monster_id)
+            except Exception:
+                continue
+            if self.settings.params_version != version:
+                return
+            self.cache.portraits.put(monster_id, portrait)
+            await asyncio.sleep(PREWARM_DELAY)
+
+        # tiles and latent bars are drawn on the render worker with a scratch cache,
+        # the shared cache is only read and filled here on the event loop
+        scratch = PadBuildImageCache()
+        scratch_pbg = PadBuildImageGenerator(pbg.params, None, cache=scratch)
+        for key in self.usage.topUsage('tiles', PREWARM_COUNT):
+            if self.settings.params_version != version:
+                return
+            card, show_stats, show_supers = tile_card(json.loads(key))
+            cache_key = tuple(tile_key(card, show_stats, show_supers))
+            portrait = self.cache.portraits.get(card['ID'])
+            if portrait is None or cache_key in self.cache.tiles:
+                continue
+            scratch.portraits.put(card['ID'], portrait)
+            try:
+                tile = await loop.run_in_executor(self.render_executor, scratch_pbg.draw_portrait,
+                                                  card, show_stats, show_supers)
+            except Exception:
+                continue
+            if self.settings.params_version != version:
+                return
+            self.cache.tiles.put(cache_key, tile)
+            await asyncio.sleep(PREWARM_DELAY)
+
+        for key in self.usage.topUsage('latents', PREWARM_COUNT):
+            if self.settings.params_version != version:
+                return
+            latents = [int(l) for l in key.split(',')][0:MAX_LATENTS]
+            if tuple(latents) in self.cache.latents:
+                continue
+            try:
+                latents_bar = await loop.run_in_executor(self.render_executor, scratch_pbg.draw_latents, latents)
+            except Exception:
+                continue
+            if self.settings.params_version != version:
+                return
+            self.cache.latents.put(tuple(latents), latents_bar)
+            await asyncio.sleep(PREWARM_DELAY)
 
     @commands.command()
     async def helpbuildimg(self, ctx):
@@ -729,10 +1234,12 @@ class PadBuildImage(commands.Cog):
 
         # start = time.perf_counter()
         params = self.settings.buildImgParams()
+        self.cache.sync(self.settings.params_version)
         try:
-            pbg = PadBuildImageGenerator(params, self.bot.get_cog('PadInfo'))
+            pbg = PadBuildImageGenerator(params, self.bot.get_cog('PadInfo'), cache=self.cache)
             # print('PARSE: {}'.format(time.perf_counter() - start))
             pbg.process_build(build_str)
+            self.usage.recordBuildUsage(pbg.build)
             # start = time.perf_counter()
             pbg.generate_build_image()
             # print('DRAW: {}'.format(time.perf_counter() - start))
@@ -740,23 +1247,117 @@ class PadBuildImage(commands.Cog):
             await ctx.send(box(str(ex) + '\nSee ^helpbuildimg for syntax'))
             return -1
 
+        self.last_builds.put(ctx.author.id, (self.settings.params_version, pbg))
+        return await self.sendBuild(ctx, pbg)
+
+    @commands.command()
+    async def editbuild(self, ctx, *, build_str: str):
+        """Edit your last build image.
+        Post the full build again with your changes, only the changed slots are redrawn.
+        """
+        last_build = self.last_builds.get(ctx.author.id)
+        if last_build is None or last_build[0] != self.settings.params_version:
+            return await ctx.invoke(self.padbuildimg, build_str=build_str)
+        self.cache.sync(self.settings.params_version)
+        pbg = last_build[1]
+        try:
+            changed = pbg.edit_build(build_str)
+            # unchanged slots were counted when the build was first made
+            self.usage.recordBuildUsage({'TEAM': changed}, show_supers=len(pbg.build['TEAM']) != 2)
+        except commands.UserFeedbackCheckFailure as ex:
+            await ctx.send(box(str(ex) + '\nSee ^helpbuildimg for syntax'))
+            return -1
+        return await self.sendBuild(ctx, pbg)
+
+    @commands.command(aliases=['guideimg'])
+    async def buildimgguide(self, ctx, *, build_str: str = ''):
+        """Create build images for a whole guide.
+        Teams are split into pages of 3, each page is sent as soon as it is drawn.
+        Long guides can be attached as a text file instead, at most 20 pages are sent.
+        """
+        if ctx.message.attachments:
+            if ctx.message.attachments[0].size > MAX_GUIDE_BYTES:
+                await ctx.send(box('Guide is too large, the limit is {} KB'.format(MAX_GUIDE_BYTES // 1024)))
+                return -1
+            data = await ctx.message.attachments[0].read()
+            build_str = data.decode('utf-8', errors='replace')
+        if not build_str.strip():
+            await ctx.send(box('Invalid build, see ^helpbuildimg'))
+            return -1
+        params = self.settings.buildImgParams()
+        pbg = PadBuildImageGenerator(params, self.bot.get_cog('PadInfo'))
+        pages = pbg.process_pages(build_str)
+        # pages render off the event loop on the single render worker, so the next page renders while the
+        # last one uploads and this guide's cache is only ever touched by that worker
+        cache = PadBuildImageCache()
+        loop = asyncio.get_running_loop()
+        rendering = None
+        scheduled = 0
+        page_no = 0
+        truncated = False
+        while True:
+            error = None
+            try:
+                page = next(pages, None)
+            except commands.UserFeedbackCheckFailure as ex:
+                page = None
+                error = ex
+            if page is not None and scheduled >= MAX_GUIDE_PAGES:
+                page = None
+                truncated = True
+            next_rendering = None
+            if page is not None:
+                self.usage.recordBuildUsage({'TEAM': page})
+                next_rendering = loop.run_in_executor(self.render_executor, render_page, params, page, cache)
+                scheduled += 1
+            if rendering is not None:
+                build_png = await rendering
+                if build_png is not None:
+                    page_no += 1
+                    with io.BytesIO(build_png) as build_io:
+                        sent = await self.sendBuildFile(ctx, build_io, 'pad_build_{}.png'.format(page_no),
+                                                        announce=False)
+                    if not sent:
+                        return -1
+            if error is not None:
+                await ctx.send(box(str(error) + '\nSee ^helpbuildimg for syntax'))
+                break
+            if next_rendering is None:
+                break
+            rendering = next_rendering
+        if page_no == 0 and error is None:
+            await ctx.send(box('Invalid build, see ^helpbuildimg'))
+            return -1
+        if page_no > 0 and ctx.guild and self.settings.dmOnly(ctx.guild.id):
+            await ctx.send(inline('Sent {} page(s) to {}'.format(page_no, ctx.author)))
+        if truncated:
+            await ctx.send(inline('Guide stopped after {} pages, split it into several posts'.format(MAX_GUIDE_PAGES)))
+        return -1 if error is not None else 0
+
+    async def sendBuild(self, ctx, pbg):
         # start = time.perf_counter()
         if pbg.build_img is not None:
             with io.BytesIO() as build_io:
                 pbg.build_img.save(build_io, format='PNG')
                 build_io.seek(0)
-                if ctx.guild and self.settings.dmOnly(ctx.guild.id):
-                    try:
-                        await ctx.author.send(file=discord.File(build_io,'pad_build.png'))
-                        await ctx.send(inline('Sent build to {}'.format(ctx.author)))
-                    except discord.errors.Forbidden as ex:
-                        await ctx.send(inline('Failed to send build to {}'.format(ctx.author)))
-                else:
-                    await ctx.send(file=discord.File(build_io,'pad_build.png'))
+                await self.sendBuildFile(ctx, build_io)
         else:
             await ctx.send(box('Invalid build, see ^helpbuildimg'))
         return 0
 
+    async def sendBuildFile(self, ctx, build_io, filename='pad_build.png', announce=True):
+        if ctx.guild and self.settings.dmOnly(ctx.guild.id):
+            try:
+                await ctx.author.send(file=discord.File(build_io, filename))
+                if announce:
+                    await ctx.send(inline('Sent build to {}'.format(ctx.author)))
+            except discord.errors.Forbidden as ex:
+                await ctx.send(inline('Failed to send build to {}'.format(ctx.author)))
+                return False
+        else:
+            await ctx.send(file=discord.File(build_io, filename))
+        return True
+
     @commands.command()
     @checks.is_owner()
     async def configbuildimg(self, ctx, param_key: str, param_value: str):
@@ -764,9 +1365,9 @@ class PadBuildImage(commands.Cog):
         Configure PadBuildImageGenerator parameters:
             ASSETS_DIR - directory for storing assets (use ^refreshassets to update)
             PORTRAIT_DIR - path pattern to where portraits are stored, {monster_id} must be present
-            PORTRAIT_WIDTH - width of portraits, default 100
+            PORTRAIT_WIDTH - width of portraits, default 100 (portraits, icons and text are scaled to match)
             PADDING - padding between various things, default 10
-            LATENTS_WIDTH - width of 1 slot latent, default 25
+            LATENTS_WIDTH - width of 1 slot latent, default 25 (latent icons are scaled to match)
             FONT_NAME - path to font
         """
         if param_key in ['ASSETS_DIR', 'PORTRAIT_DIR', 'PORTRAIT_WIDTH', 'PADDING', 'LATENTS_WIDTH', 'FONT_NAME']:
@@ -788,6 +1389,7 @@ class PadBuildImage(commands.Cog):
         await ctx.send('Downloading assets to {}'.format(self.settings.buildImgParams().ASSETS_DIR))
         awk_ids = self.bot.get_cog('Dadguide').database.get_awoken_skill_ids()
         await self.settings.downloadAllAssets(awk_ids)
+        self.startPrewarm()
         await ctx.send('Done')
 
     @commands.command()
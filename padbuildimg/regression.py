@@ -0,0 +1,408 @@
+"""
+Golden image regression check for the build image renderer.
+
+Renders a fixed corpus of build strings against a stub monster database and synthetic portraits,
+compares each result with a reference PNG and enforces per case render time and peak memory budgets.
+Every case renders a second time on the warm cache, that render is timed and compared as well.
+
+    python -m padbuildimg.regression            # check every case
+    python -m padbuildimg.regression 2p 3p      # check some cases
+    python -m padbuildimg.regression --update   # rewrite the reference PNGs
+    python -m padbuildimg.regression --latents  # check the latent tables against the original logic
+
+Each case renders in a forked child so peak memory can be read from ru_maxrss (Linux, KiB).
+
+The renderer module imports discord.py, Red and rpadutils when it loads, so run this from an environment
+where the cog itself can load (e.g. Red's venv with rpadutils from nachoapps/rpad-cogs on the path).
+
+The references in padbuildimg/regression/ were generated from the original renderer, before the
+caching/scaling/latent table rewrites. Only use --update for an intentional visual change.
+The diff is strict enough to catch one changed digit, so a Pillow/FreeType upgrade that moves text
+antialiasing will also fail every case, check the images by eye and --update in that case.
+"""
+import argparse
+import io
+import os
+import pickle
+import random
+import resource
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from PIL import Image
+from PIL import ImageChops
+from PIL import ImageDraw
+from PIL import ImageFilter
+
+from . import padbuildimg as renderer
+from .padbuildimg import DictWithAttributeAccess, PadBuildImageGenerator
+from .padbuildimg import LATENTS_MAP, MAX_LATENTS, REVERSE_LATENTS_MAP, TYPE_TO_KILLERS_MAP
+from .padbuildimg import PaDTeamLexer, validate_latents
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(PACKAGE_DIR, 'assets') + '/'
+REFERENCE_DIR = os.path.join(PACKAGE_DIR, 'regression') + '/'
+
+# a pixel differs when any channel of the blurred difference is above DIFF_THRESHOLD (0-255),
+# a case fails when more than DIFF_TOLERANCE pixels differ, small enough to catch a single changed digit
+DIFF_THRESHOLD = 64
+DIFF_TOLERANCE = 10
+
+ATTR_COLORS = ['red', 'blue', 'green', 'yellow', 'purple']
+
+# name: (monster_id, attr1, types, options)
+STUB_MONSTERS = {
+    'bj': (2000, 3, ['Devil', 'Attacker'], {'supers': [45, 46]}),
+    'weld': (3000, 0, ['Machine'], {}),
+    'baldin': (2001, 3, ['Dragon', 'Healer'], {'supers': [47]}),
+    'gilgamesh': (3001, 3, ['God'], {}),
+    'youyu': (2002, 2, ['Balance'], {}),
+    'assist reeche': (3002, 2, ['Machine'], {}),
+    'mel': (2003, 1, ['Healer'], {}),
+    'chocolate': (3003, 1, ['Physical'], {}),
+    'isis': (2004, 1, ['God', 'Attacker'], {}),
+    'koenma': (3004, 4, ['Devil'], {}),
+    'rathian': (3005, 0, ['Dragon'], {}),
+    'amen': (2005, 0, ['God'], {'limit_mult': 10}),
+    'dios': (2006, 0, ['God', 'Physical'], {}),
+    'whaledor': (2007, 0, ['Dragon'], {'inheritable': False}),
+    'mnoah': (2008, 2, ['Dragon', 'Devil'], {}),
+    'assist jack frost': (3006, 2, ['Attacker'], {}),
+    'tengu': (2009, 2, ['Physical'], {}),
+    'durandalf': (3007, 2, ['Machine'], {}),
+    'zela': (2010, 1, ['Dragon', 'Attacker'], {'supers': [48, 49]}),
+    'assist amen': (3008, 0, ['God'], {}),
+    'base raizer': (2011, 0, ['Dragon'], {}),
+    'base valeria': (2012, 3, ['Devil'], {}),
+    'eir': (2013, 1, ['God', 'Healer'], {}),
+    'dmeta': (2014, 4, ['Dragon', 'Devil'], {'limit_mult': 10}),
+    'uruka': (3009, 4, ['Devil'], {}),
+    'hmyne': (2015, 3, ['Balance'], {'limit_mult': 10}),
+    'buruka': (3010, 3, ['Dragon'], {}),
+}
+
+# name: (build string, cold seconds, warm cache seconds, peak MiB)
+# budgets are about 3x the slowest of 10 runs and the highest peak + 4MiB, measured on a dev box
+CASES = {
+    '1p': ('bj(weld)lv110/baldin[gok *3](gilgamesh)/youyu(assist reeche)/mel(chocolate)/isis(koenma)/bj(rathian)',
+           0.10, 0.02, 11),
+    '2p': ('amen/dios(sdr) * 3/whaledor; mnoah(assist jack frost) *3/tengu/tengu[sdr,sdr,sdr,sdr,sdr,sdr](durandalf)',
+           0.15, 0.025, 13),
+    '3p': ('zela(assist amen) *3/base raizer * 2/zela; zela(assist amen) *4/base valeria/zela; zela * 6',
+           0.10, 0.045, 16),
+    'latent_validation': ('eir[drk,drk,sdr]/eir[bak,bak,sdr]/eir[sdr *4, dek]/eir[sdr *8, dek]',
+                          0.08, 0.015, 10),
+    'stats_validation': ('dmeta(uruka|lv110+297slvmax)|+h33+a66+r99lv110slv15/'
+                         '    hmyne(buruka|lv110+297slv1)|+h99+a99+r99lv110slv15',
+                         0.10, 0.01, 9),
+    'repeats': ('zela * 6; amen(assist amen) * 2/tengu * 4', 0.12, 0.035, 13),
+    'sdr_assists': ('amen(sdr)/sdr/dios()/tengu(sdr)*2/zela(sdr)', 0.10, 0.02, 11),
+    'supers': ('bj|sa1lv110/bj|sa2/baldin|sa1/zela|sa2lv110slvmax/zela|sa1aw5', 0.12, 0.02, 10),
+    'off_color_assists': ('amen(chocolate)/mel(weld)/zela(koenma|lv110aw9)/tengu(gilgamesh)/eir(rathian)',
+                          0.12, 0.015, 11),
+    'full_latents': ('dmeta[hp+,atk+,rcv+,all]/tengu[sdr *8]/mel[hp,atk,rcv,ah,rres,bres,gres,lres]/'
+                     'zela[drk *2, hp, sdr, ah]',
+                     0.12, 0.02, 10),
+}
+
+
+def stub_monster(monster_id, attr1, types, inheritable=True, supers=(), limit_mult=None, level=99):
+    awakenings = [SimpleNamespace(awoken_skill_id=1 + (monster_id + i) % 40) for i in range(9)]
+    awakenings.extend(SimpleNamespace(awoken_skill_id=awk) for awk in supers)
+    return SimpleNamespace(
+        monster_id=monster_id,
+        monster_no_na=monster_id,
+        monster_no_jp=monster_id,
+        attr1=attr1,
+        types=[SimpleNamespace(name=t) for t in types],
+        is_inheritable=inheritable,
+        level=level,
+        limit_mult=limit_mult,
+        active_skill=SimpleNamespace(turn_max=10 + monster_id % 7, turn_min=5),
+        awakenings=awakenings,
+        superawakening_count=len(supers),
+    )
+
+
+class StubPadInfo(object):
+    """Stands in for the PadInfo cog, only findMonster is used by the generator."""
+
+    def __init__(self):
+        self.monsters = {name: stub_monster(monster_id, attr1, types, **options)
+                         for name, (monster_id, attr1, types, options) in STUB_MONSTERS.items()}
+
+    def findMonster(self, query):
+        monster = self.monsters.get(query.strip().lower())
+        if monster is None:
+            return None, 'Could not find a match for: {}'.format(query), None
+        return monster, None, None
+
+
+def write_portraits(portrait_dir):
+    # deterministic portraits so the references do not depend on the network
+    for monster_id, attr1, _, _ in STUB_MONSTERS.values():
+        portrait = Image.new('RGBA', (100, 100), ATTR_COLORS[attr1])
+        draw = ImageDraw.Draw(portrait)
+        draw.rectangle((10, 10, 89, 89), outline='black', width=3)
+        draw.line((10, 10 + monster_id % 80, 89, 89 - monster_id % 80), fill='white', width=3)
+        del draw
+        portrait.save(os.path.join(portrait_dir, '{:05d}.png'.format(monster_id)))
+
+
+def make_params(portrait_dir):
+    return DictWithAttributeAccess({
+        'ASSETS_DIR': ASSETS_DIR,
+        'PORTRAIT_DIR': os.path.join(portrait_dir, '{monster_id:05d}.png'),
+        'PORTRAIT_WIDTH': 100,
+        'PADDING': 10,
+        'LATENTS_WIDTH': 25,
+        'FONT_NAME': ASSETS_DIR + 'OpenSans-ExtraBold.ttf'
+    })
+
+
+def new_cache():
+    # only pass a cache to renderers that have one, so the same corpus runs against older trees
+    if hasattr(renderer, 'PadBuildImageCache'):
+        return renderer.PadBuildImageCache()
+    return None
+
+
+def render(params, build_str, cache=None):
+    if cache is not None:
+        pbg = PadBuildImageGenerator(params, StubPadInfo(), cache=cache)
+    else:
+        pbg = PadBuildImageGenerator(params, StubPadInfo())
+    pbg.process_build(build_str)
+    pbg.generate_build_image()
+    return pbg.build_img
+
+
+def measure(params, build_str):
+    """
+    Render twice in a forked child, the second time with the cache left by the first.
+    Returns (cold seconds, warm seconds, peak KiB, [cold png bytes, warm png bytes]).
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            cache = new_cache()
+            start = time.perf_counter()
+            build_img = render(params, build_str, cache)
+            elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            warm_img = render(params, build_str, cache)
+            warm_elapsed = time.perf_counter() - start
+            peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss
+            pngs = []
+            for img in (build_img, warm_img):
+                with io.BytesIO() as build_io:
+                    img.save(build_io, format='PNG')
+                    pngs.append(build_io.getvalue())
+            result = (elapsed, warm_elapsed, peak_rss, pngs)
+        except BaseException as ex:
+            result = '{}: {}'.format(type(ex).__name__, ex)
+        with os.fdopen(write_fd, 'wb') as f:
+            pickle.dump(result, f)
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd, 'rb') as f:
+        result = pickle.load(f)
+    os.waitpid(pid, 0)
+    if isinstance(result, str):
+        raise RuntimeError(result)
+    return result
+
+
+def perceptual_diff(build_img, reference):
+    """Number of pixels that differ visibly, every pixel counts when the sizes differ."""
+    if build_img.size != reference.size:
+        return max(build_img.width * build_img.height, reference.width * reference.height)
+    # blur first so a one pixel shift in anti aliased text does not count as a regression,
+    # then count pixels instead of averaging so a single changed tile is not lost in a large image
+    a = build_img.convert('RGBA').filter(ImageFilter.GaussianBlur(1))
+    b = reference.convert('RGBA').filter(ImageFilter.GaussianBlur(1))
+    channels = ImageChops.difference(a, b).split()
+    diff = channels[0]
+    for channel in channels[1:]:
+        diff = ImageChops.lighter(diff, channel)
+    return sum(diff.histogram()[DIFF_THRESHOLD + 1:])
+
+
+def legacy_validate_latents(latents, card_types):
+    # validate_latents before the killer mask tables
+    if latents is None:
+        return None
+    if card_types is None:
+        return None
+    if 'Balance' in card_types:
+        return latents
+    for idx, l in enumerate(latents):
+        if 0 < l < 9:
+            if not any([l in TYPE_TO_KILLERS_MAP[t] for t in card_types if t is not None]):
+                latents[idx] = None
+    latents = [l for l in latents if l is not None]
+    return latents if len(latents) > 0 else None
+
+
+def legacy_parse_latents(value):
+    # PaDTeamLexer.t_LATENT before single pass repeat expansion
+    value = [l.strip().lower() for l in value.strip('[]').split(',')]
+    for v in value.copy():
+        if '*' not in v:
+            continue
+        tmp = [l.strip() for l in v.split('*')]
+        if len(tmp[0]) == 1 and tmp[0].isdigit():
+            count = int(tmp[0])
+            latent = tmp[1]
+        elif len(tmp[1]) == 1 and tmp[1].isdigit():
+            count = int(tmp[1])
+            latent = tmp[0]
+        else:
+            continue
+        idx = value.index(v)
+        value.remove(v)
+        for i in range(count):
+            value.insert(idx, latent)
+    value = value[0:MAX_LATENTS]
+    return [REVERSE_LATENTS_MAP[l] for l in value if l in REVERSE_LATENTS_MAP]
+
+
+def legacy_pack_latents(latents, sizes):
+    # combine_latents placement before pack_latents
+    x_offset = 0
+    y_offset = 0
+    row_count = 0
+    one_slot, two_slot = [], []
+    for l in latents:
+        if l < 22:
+            two_slot.append(l)
+        else:
+            one_slot.append(l)
+    sorted_latents = []
+    if len(one_slot) > len(two_slot):
+        sorted_latents.extend(one_slot)
+        sorted_latents.extend(two_slot)
+    else:
+        sorted_latents.extend(two_slot)
+        sorted_latents.extend(one_slot)
+    last_height = 0
+    placements = []
+    for l in sorted_latents:
+        width, height = sizes[l]
+        if x_offset + width > 100:
+            row_count += 1
+            x_offset = 0
+            y_offset += last_height
+        if row_count >= MAX_LATENTS//4 and x_offset + width >= 25 * (MAX_LATENTS%4):
+            break
+        placements.append((l, x_offset, y_offset))
+        last_height = height
+        x_offset += width
+    return placements
+
+
+def check_latents(iterations=20000, seed=0):
+    """Property check: latent parsing, validation and packing match the original per latent logic."""
+    rng = random.Random(seed)
+    sizes = {}
+    for l, name in LATENTS_MAP.items():
+        with Image.open(ASSETS_DIR + 'lat/' + name + '.png') as latent_icon:
+            sizes[l] = latent_icon.size
+    lexer = PaDTeamLexer()
+    card_types = list(TYPE_TO_KILLERS_MAP) + ['Balance', None]
+    names = list(LATENTS_MAP.values()) + ['xyz', '']
+    counts = ['0', '1', '3', '9', '10', '']
+    failures = []
+    for _ in range(iterations):
+        latents = [rng.choice(list(LATENTS_MAP)) for _ in range(rng.randint(0, MAX_LATENTS + 2))]
+        types = rng.sample(card_types, rng.randint(0, 3))
+        if validate_latents(list(latents), types) != legacy_validate_latents(list(latents), types):
+            failures.append('validate_latents({}, {})'.format(latents, types))
+        if renderer.pack_latents(latents, sizes, 100, 25) != legacy_pack_latents(latents, sizes):
+            failures.append('pack_latents({})'.format(latents))
+        parts = []
+        for _ in range(rng.randint(1, 6)):
+            name, count = rng.choice(names), rng.choice(counts)
+            parts.append(rng.choice([name, name + '*' + count, count + ' *' + name, name + ' * ' + count, '*']))
+        value = '[' + ','.join(parts) + ']'
+        token = SimpleNamespace(value=value)
+        if lexer.t_LATENT(token).value != legacy_parse_latents(value):
+            failures.append('t_LATENT({})'.format(value))
+    for failure in failures[:10]:
+        print('latents FAIL {}'.format(failure))
+    print('{:20} {:4} {} iterations'.format('latents', 'FAIL' if failures else 'ok', iterations))
+    return ['latents'] if failures else []
+
+
+def run(names, update=False):
+    failures = []
+    with tempfile.TemporaryDirectory() as portrait_dir:
+        write_portraits(portrait_dir)
+        params = make_params(portrait_dir)
+        if update and not os.path.exists(REFERENCE_DIR):
+            os.mkdir(REFERENCE_DIR)
+        for name in names:
+            build_str, time_budget, warm_time_budget, memory_budget = CASES[name]
+            try:
+                elapsed, warm_elapsed, peak_rss, pngs = measure(params, build_str)
+            except RuntimeError as ex:
+                failures.append(name)
+                print('{:20} ERROR {}'.format(name, ex))
+                continue
+            reference_path = REFERENCE_DIR + name + '.png'
+            problems = []
+            if update:
+                with open(reference_path, 'wb') as f:
+                    f.write(pngs[0])
+                diff = 0
+            elif not os.path.exists(reference_path):
+                problems.append('missing reference, run with --update')
+                diff = 0
+            else:
+                diffs = []
+                with Image.open(reference_path) as reference:
+                    for png in pngs:
+                        with Image.open(io.BytesIO(png)) as build_img:
+                            diffs.append(perceptual_diff(build_img, reference))
+                diff = max(diffs)
+                if diffs[0] > DIFF_TOLERANCE:
+                    problems.append('diff {}px > {}px'.format(diffs[0], DIFF_TOLERANCE))
+                if diffs[1] > DIFF_TOLERANCE:
+                    problems.append('warm diff {}px > {}px'.format(diffs[1], DIFF_TOLERANCE))
+            if elapsed > time_budget:
+                problems.append('time {:.3f}s > {:.3f}s'.format(elapsed, time_budget))
+            if warm_elapsed > warm_time_budget:
+                problems.append('warm {:.3f}s > {:.3f}s'.format(warm_elapsed, warm_time_budget))
+            if peak_rss / 1024 > memory_budget:
+                problems.append('memory {:.1f}MiB > {}MiB'.format(peak_rss / 1024, memory_budget))
+            if problems:
+                failures.append(name)
+            print('{:20} {:4} diff={}px time={:.3f}s warm={:.3f}s peak={:.1f}MiB {}'.format(
+                name, 'FAIL' if problems else 'ok', diff, elapsed, warm_elapsed, peak_rss / 1024, ', '.join(problems)))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Golden image regression check for padbuildimg.')
+    parser.add_argument('cases', nargs='*', help='case names, default all: ' + ', '.join(CASES))
+    parser.add_argument('--update', action='store_true', help='rewrite reference images')
+    parser.add_argument('--latents', action='store_true', help='only run the latent table property check')
+    args = parser.parse_args()
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error('unknown cases: ' + ', '.join(unknown))
+    failures = [] if args.update else check_latents()
+    if not args.latents:
+        failures += run(args.cases or list(CASES), update=args.update)
+    if failures:
+        print('{} failed: {}'.format(len(failures), ', '.join(failures)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()